@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_ENDPOINT = 'https://api.deepseek.com/chat/completions'
+DEFAULT_MODEL = 'deepseek-chat'
+
+SYSTEM_PROMPT = """你是工业设备故障诊断领域的 AI 专家。
+请根据以下提供的信息生成一份结构化的诊断报告，格式必须固定为以下七个部分标题，每一部分按顺序输出：
+---
+一、数据摘要
+二、可能故障原因分析
+三、问题严重性评估
+四、建议排查步骤
+五、推荐解决方案
+六、预防性维护建议
+七、备注
+【格式要求】：
+1. 【非常重要】禁止使用任何Markdown格式化标记，例如“##”、“-”、“*”、“**”等。所有内容都必须是纯文本。
+2. 所有内容以"工程报告风格"编写，禁止使用对话语气。
+3. 第三部分"问题严重性评估"必须采用如下卡片式格式，不允许使用表格线或竖线（|）：
+
+【立即停机】
+等级：紧急
+原因：持续运行将导致轴承完全失效
+
+【维修紧迫性】
+等级：紧急
+原因：振动能量持续升高，可能造成轴系损伤
+
+【设备安全性】
+等级：危险
+原因：多参数严重超标，可能引发连锁故障
+
+【生产影响】
+等级：严重
+原因：剩余寿命预计 <24 小时，基于峭度指标恶化速率预测
+
+4. 所有标题和项目必须严格输出，不可省略，不可变换顺序。
+5. 最终内容必须适合直接用于 PDF 报告生成或在网页中美观展示。
+"""
+
+
+class ReportBusyError(RuntimeError):
+    """并发报告数已满，等待超时"""
+
+
+def canonical_hash(structured_data: Dict) -> str:
+    """对诊断数据做规范化序列化后取 SHA-256，作为报告缓存键"""
+    text = json.dumps(structured_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def build_user_prompt(structured_data: Dict) -> str:
+    diagnosis = structured_data.get('diagnosis', {})
+    features = structured_data.get('features', {})
+    file_info = structured_data.get('file_info', {})
+    diagnosis_time = structured_data.get('diagnosis_time', '')
+    return f"""以下是待诊断的设备故障信息：\n- 诊断时间: {diagnosis_time}\n- 文件名: {file_info.get('filename', '未知')}\n- 数据列: {', '.join(file_info.get('columns', []))}\n- 诊断结论: {diagnosis.get('result', '未知')}\n- 置信度: {diagnosis.get('confidence', '未知')}\n- 各类别概率分布: {', '.join([f"{p['label']} {p['value']:.2f}" for p in diagnosis.get('probabilities', [])])}\n- 统计特征: {features if features else '无'}\n\n请根据以上信息，结合你的领域知识，生成标准化诊断报告。【注意】报告最后的“报告生成时间”请严格填写为：{diagnosis_time}，不要用你自己的时间。"""
+
+
+class ReportCache:
+    """内存 LRU + 可选磁盘缓存"""
+
+    def __init__(self, max_entries: int = 128, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except OSError:
+                return None
+            self._remember(key, text)
+            return text
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        self._remember(key, text)
+        if self.cache_dir:
+            tmp_path = self._disk_path(key) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def _remember(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ReportClient:
+    """
+    AI 诊断报告客户端：复用连接池、按诊断数据缓存报告、
+    支持流式输出，并限制同时进行的报告请求数。
+    """
+
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, api_key: str = '', model: str = DEFAULT_MODEL,
+                 max_concurrency: int = 2, acquire_timeout: float = 5.0, timeout: float = 60.0,
+                 cache: Optional[ReportCache] = None):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.cache = cache if cache is not None else ReportCache()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_env(cls) -> 'ReportClient':
+        cache_dir = os.getenv('AI_REPORT_CACHE_DIR') or None  # 如 ai_report_cache，已在 .gitignore 中忽略
+        return cls(
+            endpoint=os.getenv('AI_REPORT_ENDPOINT', DEFAULT_ENDPOINT),
+            api_key=os.getenv('DEEPSEEK_API_KEY', ''),
+            model=os.getenv('AI_REPORT_MODEL', DEFAULT_MODEL),
+            max_concurrency=int(os.getenv('AI_REPORT_MAX_CONCURRENCY', 2)),
+            acquire_timeout=float(os.getenv('AI_REPORT_ACQUIRE_TIMEOUT', 5.0)),
+            timeout=float(os.getenv('AI_REPORT_TIMEOUT', 60.0)),
+            cache=ReportCache(int(os.getenv('AI_REPORT_CACHE_SIZE', 128)), cache_dir),
+        )
+
+    def _payload(self, structured_data: Dict, stream: bool) -> Dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                         {"role": "user", "content": build_user_prompt(structured_data)}],
+            "max_tokens": 1800, "temperature": 0.5, "stream": stream,
+        }
+
+    def _headers(self) -> Dict:
+        if not self.api_key: raise RuntimeError('DEEPSEEK_API_KEY 未配置')
+        return {"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"}
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise ReportBusyError('报告生成任务繁忙，请稍后重试')
+
+    def generate(self, structured_data: Dict) -> str:
+        """生成完整报告文本，命中缓存时不访问模型接口"""
+        key = canonical_hash(structured_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        self._acquire()
+        try:
+            response = self.session.post(self.endpoint, json=self._payload(structured_data, False),
+                                         headers=self._headers(), timeout=self.timeout)
+            response.raise_for_status()
+            text = response.json().get('choices', [{}])[0].get('message', {}).get('content', '').strip()
+        finally:
+            self._slots.release()
+
+        if text:
+            self.cache.put(key, text)
+        return text
+
+    def stream(self, structured_data: Dict) -> Iterator[str]:
+        """逐段产出报告文本；收到 [DONE] 后才写入缓存"""
+        key = canonical_hash(structured_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        self._acquire()
+        parts = []
+        completed = False
+        try:
+            with self.session.post(self.endpoint, json=self._payload(structured_data, True),
+                                   headers=self._headers(), timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=False):
+                    if not line or not line.startswith(b'data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == b'[DONE]':
+                        completed = True
+                        break
+                    chunk = json.loads(data.decode('utf-8'))
+                    delta = chunk.get('choices', [{}])[0].get('delta', {}).get('content')
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        finally:
+            self._slots.release()
+
+        # 上游未发送 [DONE] 即断开时内容可能不完整，不写入缓存
+        text = ''.join(parts).strip()
+        if completed and text:
+            self.cache.put(key, text)
+
+
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    """格式化一条 server-sent event"""
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
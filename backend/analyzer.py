@@ -1,24 +1,33 @@
 from preprocessing import (
     clean_signal,
     compute_rms,
-    compute_stats,
     compute_moving_mean,
     compute_moving_std,
+    extract_indicators,
+    indicators_for_axis,
+    stack_axes,
+    INDICATOR_LABELS,
 )
 
 def analyze_dataframe(df, sampling_rate=None, window=200):
+    """时域分析，返回 (图表结果, 各轴状态指标, 错误信息)"""
     expected_cols = [col for col in df.columns if '加速度' in col or col.strip() == 'value']
 
     if not expected_cols:
-        return None, '未识别到可用的加速度列'
+        return None, None, '未识别到可用的加速度列'
+
+    signals = [clean_signal(df[col].astype(float)) for col in expected_cols]
+    indicators = extract_indicators(stack_axes([raw.values for raw in signals]))
 
     results = []
-    for col in expected_cols:
-        raw = clean_signal(df[col].astype(float))
+    features = {}
+    for i, (col, raw) in enumerate(zip(expected_cols, signals)):
         signal = raw.tolist()
+        axis_features = indicators_for_axis(indicators, i)
+        features[str(col)] = axis_features
 
         print(f"[调试] {col} 原始数据点数: {len(signal)}")
-        print(f"[调试] {col} 统计特征: {compute_stats(raw)}")
+        print(f"[调试] {col} 统计特征: {axis_features}")
 
         #print(f"[特征频率调试] 输入特征频率: {feature_freq_list}")
         #print(f"[特征频率调试] FFT 频率轴起点: {freqs_env[0]:.2f}Hz，终点: {freqs_env[-1]:.2f}Hz，步长: {(freqs_env[1]-freqs_env[0]):.4f}Hz")
@@ -41,7 +50,7 @@ def analyze_dataframe(df, sampling_rate=None, window=200):
         results.append({
             "type": "stat",
             "axis": f"{col} 统计量",
-            "data": compute_stats(raw)
+            "data": [{"name": INDICATOR_LABELS[key], "value": value} for key, value in axis_features.items()]
         })
 
         moving_mean_data = compute_moving_mean(raw, window)
@@ -58,4 +67,4 @@ def analyze_dataframe(df, sampling_rate=None, window=200):
             "data": moving_std_data[:10000]
         })
 
-    return results, None
+    return results, features, None
@@ -0,0 +1,269 @@
+"""
+离线批量诊断：扫描目录中的振动记录 CSV，多进程计算状态指标、包络谱特征频率匹配与模型诊断，
+结果逐文件写入汇总表（CSV 或 Parquet），中断后重新运行会跳过已完成的文件。
+包络谱与 /api/spectrum 相同，默认按谱峭度图选择解调频带，--full-band 时使用全频带包络。
+
+用法：
+    python batch_scan.py <数据目录> -o summary.parquet --workers 8 --inner 162.2 --outer 107.4 --ball 141.1
+"""
+import argparse
+import csv
+import fnmatch
+import importlib.util
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+
+from file_structure import sniff_csv, plan_read_kwargs
+from preprocessing import clean_signal, extract_indicators, stack_axes, INDICATOR_LABELS
+from kurtogram import fast_kurtogram
+from spectrum import build_feature_freqs, compute_spectrum, impulsive_segment, match_feature_marks, robust_segment
+
+DEFAULT_SAMPLING_RATE = 1024.0
+
+SUMMARY_COLUMNS = (
+    ['file', 'size_bytes', 'axis', 'sampling_rate']
+    + list(INDICATOR_LABELS)
+    + ['envelope_matches', 'match_count', 'predicted_label', 'predicted_class', 'confidence', 'error']
+)
+
+_config = {}
+
+
+MODEL_DEPENDENCIES = ('torch', 'PyEMD')
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+
+
+def _predict(path, df, data_line):
+    import torch
+    from model_infer import predict, FAULT_LABELS
+
+    torch.set_num_threads(1)  # 并行度由进程池提供
+
+    pred_result = predict(path, df, data_line)
+    label = pred_result['label'][0]
+    prob_list = pred_result['prob'][0]
+    return {
+        'predicted_label': label,
+        'predicted_class': FAULT_LABELS.get(label, str(label)),
+        'confidence': float(prob_list[label]),
+    }
+
+
+def scan_file(path):
+    """诊断单个文件，返回 (路径, 字节数, 汇总行列表)"""
+    size = os.path.getsize(path)
+    try:
+        info = sniff_csv(path)
+        accel_cols = info['accel_columns']
+        if not accel_cols:
+            raise ValueError('未识别到加速度列')
+
+        plan = dict(info['plan'])
+        if _config.get('model'):
+            # 模型取前 10 列全部数据，此时读入所有列，与指标计算共用一次解析；
+            # 行起点由 load_model_frame 按 data_line 与 /api/analyze 的读取方式对齐
+            plan['usecols'] = None
+        df = pd.read_csv(path, **plan_read_kwargs(plan))
+        sampling_rate = _config.get('sampling_rate') or info['sampling_rate'] or DEFAULT_SAMPLING_RATE
+
+        signals = [clean_signal(df[col].astype(float)) for col in accel_cols]
+        indicators = extract_indicators(stack_axes([raw.values for raw in signals]))
+
+        prediction = {}
+        if _config.get('model'):
+            try:
+                prediction = _predict(path, df, info['data_line'])
+            except Exception as e:
+                prediction = {'error': f'模型推理失败: {e}'}
+
+        base_freqs = _config.get('base_freqs', {})
+        feature_freq_list = build_feature_freqs(base_freqs)
+
+        rows = []
+        for i, col in enumerate(accel_cols):
+            row = {'file': path, 'size_bytes': size, 'axis': col, 'sampling_rate': sampling_rate}
+            row.update({key: float(values[i]) for key, values in indicators.items()})
+            row.update(prediction)
+
+            sig = robust_segment(df[col].astype(float))
+            if len(sig) >= 100 and feature_freq_list:
+                # 与 /api/spectrum 一致：默认在未经 Hampel 滤波的信号上按谱峭度图选带并解调
+                band, raw = None, None
+                if _config.get('kurtogram', True):
+                    raw = impulsive_segment(df[col].astype(float))
+                    _, band = fast_kurtogram(raw, sampling_rate)
+                freqs, _, env_spec = compute_spectrum(sig, sampling_rate, band, raw)
+                if env_spec is not None:
+                    marks = match_feature_marks(freqs, env_spec, feature_freq_list, base_freqs, col)
+                    row['envelope_matches'] = '; '.join(f"{m['name']} = {m['amp']:.4g}" for m in marks)
+                    row['match_count'] = len(marks)
+            rows.append(row)
+        return path, size, rows
+
+    except Exception as e:
+        return path, size, [{'file': path, 'size_bytes': size, 'error': ' '.join(str(e).split())}]
+
+
+def find_csv_files(root, pattern='*.csv'):
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if fnmatch.fnmatch(name.lower(), pattern.lower()):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+def repair_journal(journal_path):
+    """
+    修复被强制终止的进度日志：截掉末尾不完整的一行，并去掉最后一个文件的结果行
+    （该文件的多行结果可能只写入了一部分，续跑时重新处理）。
+    返回 True 表示日志不存在或为空，需要重新写表头。
+    """
+    if not os.path.exists(journal_path):
+        return True
+    with open(journal_path, 'rb+') as f:
+        content = f.read()
+        if content and not content.endswith(b'\n'):
+            f.truncate(content.rfind(b'\n') + 1)
+    if os.path.getsize(journal_path) == 0:
+        return True
+
+    journal = pd.read_csv(journal_path, dtype=str, on_bad_lines='skip')
+    if not journal.empty:
+        journal = journal[journal['file'] != journal['file'].iloc[-1]]
+        journal.reindex(columns=SUMMARY_COLUMNS).to_csv(journal_path, index=False)
+    return False
+
+
+def load_checkpoint(journal_path, retry_errors=False):
+    """读取进度日志中已完成的文件；retry_errors 时只报错的文件不计为完成"""
+    if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+        return set()
+    done = pd.read_csv(journal_path, usecols=['file', 'axis', 'error'], dtype=str, on_bad_lines='skip')
+    if retry_errors:
+        done = done[done['axis'].notna() | done['error'].isna()]
+    return set(done['file'].dropna())
+
+
+def finalize(journal_path, output_path):
+    """将进度日志转为最终汇总表，重试成功或再次失败的文件只保留最后一次结果"""
+    summary = pd.read_csv(journal_path, on_bad_lines='skip')
+    error_only = summary['axis'].isna() & summary['error'].notna()
+    summary = summary[~(error_only & summary.duplicated('file', keep='last'))]
+
+    if output_path.lower().endswith('.parquet'):
+        summary.to_parquet(output_path, index=False)
+    else:
+        summary.to_csv(output_path, index=False)
+    os.remove(journal_path)
+
+
+def parquet_engine_available():
+    return any(importlib.util.find_spec(name) is not None for name in ('pyarrow', 'fastparquet'))
+
+
+def run_batch(root, output_path, workers=None, pattern='*.csv', sampling_rate=None,
+              base_freqs=None, model=True, kurtogram=True, restart=False, retry_errors=False, report_every=20):
+    if output_path.lower().endswith('.parquet') and not parquet_engine_available():
+        # 扫描前检查，避免整批跑完才在写出时失败
+        output_path = os.path.splitext(output_path)[0] + '.csv'
+        print(f"[批量诊断] 警告：未安装 pyarrow 或 fastparquet，汇总结果改为写入 {output_path}")
+
+    if model:
+        # 在主进程检查依赖：工作进程初始化失败会被进程池无限重启
+        missing = [name for name in MODEL_DEPENDENCIES if importlib.util.find_spec(name) is None]
+        if missing:
+            raise RuntimeError(f"模型推理依赖未安装: {', '.join(missing)}，可使用 --no-model 跳过模型推理")
+
+    journal_path = output_path + '.partial.csv'
+    if restart and os.path.exists(journal_path):
+        os.remove(journal_path)
+
+    new_journal = repair_journal(journal_path)
+    done = load_checkpoint(journal_path, retry_errors)
+    files = [f for f in find_csv_files(root, pattern) if f not in done]
+    total = len(files) + len(done)
+    print(f"[批量诊断] 共 {total} 个文件，已完成 {len(done)}，待处理 {len(files)}")
+
+    config = {'sampling_rate': sampling_rate, 'base_freqs': base_freqs or {}, 'model': model, 'kurtogram': kurtogram}
+    processed, processed_bytes = 0, 0
+    start = time.perf_counter()
+
+    def report():
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"[批量诊断] {len(done) + processed}/{total} 文件，"
+              f"{processed / elapsed:.2f} 文件/s，{processed_bytes / elapsed / 1e6:.2f} MB/s")
+
+    with open(journal_path, 'w' if new_journal else 'a', newline='', encoding='utf-8') as journal:
+        writer = csv.DictWriter(journal, fieldnames=SUMMARY_COLUMNS)
+        if new_journal:
+            writer.writeheader()
+            journal.flush()
+
+        pool = Pool(workers, initializer=_init_worker, initargs=(config,))
+        try:
+            for path, size, rows in pool.imap_unordered(scan_file, files):
+                writer.writerows(rows)
+                journal.flush()
+                processed += 1
+                processed_bytes += size
+                if processed % report_every == 0:
+                    report()
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            report()
+            print(f"[批量诊断] 已中断，进度保存在 {journal_path}，重新运行即可续跑")
+            raise
+        except BaseException:
+            # 如日志写入失败（磁盘已满），先终止进程池，否则 join() 会报错并掩盖原始异常
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    report()
+    finalize(journal_path, output_path)
+    print(f"[批量诊断] 汇总结果已写入 {output_path}")
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量诊断目录中的振动记录 CSV')
+    parser.add_argument('root', help='数据目录')
+    parser.add_argument('-o', '--output', default='batch_summary.csv', help='汇总文件路径（.csv 或 .parquet）')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='进程数，默认等于 CPU 核数')
+    parser.add_argument('--pattern', default='*.csv', help='文件名匹配模式')
+    parser.add_argument('--sampling-rate', type=float, default=None, help='采样频率，缺省时从文件中识别')
+    parser.add_argument('--inner', type=float, default=None, help='内圈故障特征频率 (Hz)')
+    parser.add_argument('--outer', type=float, default=None, help='外圈故障特征频率 (Hz)')
+    parser.add_argument('--ball', type=float, default=None, help='滚动体故障特征频率 (Hz)')
+    parser.add_argument('--no-model', action='store_true', help='跳过模型推理')
+    parser.add_argument('--full-band', action='store_true', help='包络谱使用全频带 Hilbert 包络，不做谱峭度选带')
+    parser.add_argument('--restart', action='store_true', help='忽略已有进度，重新扫描')
+    parser.add_argument('--retry-errors', action='store_true', help='续跑时重新处理上次报错的文件')
+    args = parser.parse_args(argv)
+
+    base_freqs = {"内圈": args.inner, "外圈": args.outer, "滚动体": args.ball}
+    try:
+        run_batch(args.root, args.output, workers=args.workers, pattern=args.pattern,
+                  sampling_rate=args.sampling_rate, base_freqs=base_freqs,
+                  model=not args.no_model, kurtogram=not args.full_band, restart=args.restart, retry_errors=args.retry_errors)
+    except KeyboardInterrupt:
+        return 130
+    except RuntimeError as e:
+        print(f"[批量诊断] 错误：{e}")
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
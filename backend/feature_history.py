@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+DEFAULT_DB_PATH = 'feature_history.db'
+EWMA_ALPHA = 0.3
+SECONDS_PER_DAY = 86400.0
+TREND_HALF_LIFE_DAYS = 7.0   # 近期趋势回归中观测权重减半所需的天数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    filename TEXT,
+    predicted_class TEXT,
+    confidence REAL,
+    features TEXT,
+    probabilities TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recordings_asset ON recordings (asset_id, recorded_at);
+
+CREATE TABLE IF NOT EXISTS asset_trends (
+    asset_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    origin_t REAL NOT NULL,
+    min_t REAL NOT NULL,
+    last_t REAL NOT NULL,
+    last_value REAL NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    ewma REAL NOT NULL,
+    min_value REAL NOT NULL,
+    max_value REAL NOT NULL,
+    sum_t REAL NOT NULL,
+    sum_tt REAL NOT NULL,
+    sum_ty REAL NOT NULL,
+    decayed_w REAL NOT NULL,
+    decayed_t REAL NOT NULL,
+    decayed_tt REAL NOT NULL,
+    decayed_y REAL NOT NULL,
+    decayed_ty REAL NOT NULL,
+    PRIMARY KEY (asset_id, metric)
+);
+"""
+
+
+def flatten_metrics(features: Dict, probabilities: Optional[List[Dict]] = None) -> Dict[str, float]:
+    """将 {轴: {指标: 值}} 与类别概率展开为 {'轴|指标': 值, 'prob|类别': 值}"""
+    metrics = {}
+    for axis, values in (features or {}).items():
+        for name, value in values.items():
+            if value is not None and value == value:  # 跳过 None / NaN
+                metrics[f"{axis}|{name}"] = float(value)
+    for item in probabilities or []:
+        metrics[f"prob|{item['label']}"] = float(item['value'])
+    return metrics
+
+
+def _update_trend(row: Optional[sqlite3.Row], t: float, y: float,
+                  half_life_days: float = TREND_HALF_LIFE_DAYS) -> Dict:
+    """
+    在已有聚合上追加一个观测值：Welford 方差、EWMA、全量线性回归累加量，
+    以及按时间指数衰减的近期回归累加量（各累加量均以 last_t 时刻为基准衰减）。
+    """
+    if row is None:
+        return {
+            'n': 1, 'origin_t': t, 'min_t': t, 'last_t': t, 'last_value': y, 'mean': y, 'm2': 0.0, 'ewma': y,
+            'min_value': y, 'max_value': y, 'sum_t': 0.0, 'sum_tt': 0.0, 'sum_ty': 0.0,
+            'decayed_w': 1.0, 'decayed_t': 0.0, 'decayed_tt': 0.0, 'decayed_y': y, 'decayed_ty': 0.0,
+        }
+
+    n = row['n'] + 1
+    delta = y - row['mean']
+    mean = row['mean'] + delta / n
+    # 回归时间轴以首条写入的记录为零点、按天计，避免平方和精度损失；
+    # 回填旧记录时 origin_t 不一定是最早时间，最早时间单独记在 min_t
+    dt = (t - row['origin_t']) / SECONDS_PER_DAY
+    latest = t >= row['last_t']
+
+    # 新记录：已有累加量按经过的时间衰减后加入权重 1 的观测；
+    # 回填的旧记录：累加量不变，观测按其距 last_t 的时间折算权重
+    age = abs(t - row['last_t']) / SECONDS_PER_DAY
+    decay = 0.5 ** (age / half_life_days)
+    keep, w = (decay, 1.0) if latest else (1.0, decay)
+
+    return {
+        'n': n,
+        'origin_t': row['origin_t'],
+        'min_t': min(row['min_t'], t),
+        'last_t': t if latest else row['last_t'],
+        'last_value': y if latest else row['last_value'],
+        'mean': mean,
+        'm2': row['m2'] + delta * (y - mean),
+        'ewma': EWMA_ALPHA * y + (1 - EWMA_ALPHA) * row['ewma'] if latest else row['ewma'],
+        'min_value': min(row['min_value'], y),
+        'max_value': max(row['max_value'], y),
+        'sum_t': row['sum_t'] + dt,
+        'sum_tt': row['sum_tt'] + dt * dt,
+        'sum_ty': row['sum_ty'] + dt * y,
+        'decayed_w': keep * row['decayed_w'] + w,
+        'decayed_t': keep * row['decayed_t'] + w * dt,
+        'decayed_tt': keep * row['decayed_tt'] + w * dt * dt,
+        'decayed_y': keep * row['decayed_y'] + w * y,
+        'decayed_ty': keep * row['decayed_ty'] + w * dt * y,
+    }
+
+
+def _fit_line(w: float, sum_t: float, sum_tt: float, sum_y: float, sum_ty: float):
+    """由（加权）累加量求最小二乘直线，返回 (斜率, 截距)；时间点不足两个时斜率为 0"""
+    denom = w * sum_tt - sum_t ** 2
+    slope = (w * sum_ty - sum_t * sum_y) / denom if denom > 1e-12 * max(w * sum_tt, 1.0) else 0.0
+    return slope, (sum_y - slope * sum_t) / w
+
+
+def summarize_trend(row: sqlite3.Row) -> Dict:
+    """
+    由聚合量直接得到趋势统计，斜率单位为 每天。
+    slope_per_day 为全部记录的回归斜率，recent_slope_per_day 为按时间指数衰减加权的近期斜率。
+    """
+    n = row['n']
+    slope, intercept = _fit_line(n, row['sum_t'], row['sum_tt'], row['mean'] * n, row['sum_ty'])
+    recent_slope, recent_intercept = _fit_line(row['decayed_w'], row['decayed_t'], row['decayed_tt'],
+                                               row['decayed_y'], row['decayed_ty'])
+    return {
+        'metric': row['metric'],
+        'count': n,
+        'first_time': row['min_t'],
+        'last_time': row['last_t'],
+        'last_value': row['last_value'],
+        'mean': row['mean'],
+        'std': (row['m2'] / (n - 1)) ** 0.5 if n > 1 else 0.0,
+        'ewma': row['ewma'],
+        'min': row['min_value'],
+        'max': row['max_value'],
+        'slope_per_day': slope,
+        'intercept': intercept,  # 回归在 regression_origin 时刻的取值
+        'recent_slope_per_day': recent_slope,
+        'recent_intercept': recent_intercept,
+        'regression_origin': row['origin_t'],
+    }
+
+
+class FeatureHistory:
+    """
+    按设备（轴承）保存每次记录的状态指标与模型概率，并增量维护趋势聚合，
+    趋势与剩余寿命查询只读取聚合表，不回溯历史记录。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, half_life_days: float = TREND_HALF_LIFE_DAYS):
+        self.db_path = db_path
+        # 近期累加量按此半衰期写入数据库，同一数据库应始终使用相同的值
+        self.half_life_days = half_life_days
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """打开连接，正常退出时提交事务，最后关闭连接"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, asset_id: str, features: Dict, probabilities: Optional[List[Dict]] = None,
+               predicted_class: Optional[str] = None, confidence: Optional[float] = None,
+               filename: Optional[str] = None, recorded_at: Optional[float] = None) -> int:
+        """写入一次记录并更新该设备的趋势聚合，返回记录 id"""
+        recorded_at = time.time() if recorded_at is None else float(recorded_at)
+        metrics = flatten_metrics(features, probabilities)
+
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO recordings (asset_id, recorded_at, filename, predicted_class, confidence, features, probabilities) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (asset_id, recorded_at, filename, predicted_class, confidence,
+                 json.dumps(features, ensure_ascii=False), json.dumps(probabilities or [], ensure_ascii=False)),
+            )
+            existing = {
+                row['metric']: row
+                for row in conn.execute("SELECT * FROM asset_trends WHERE asset_id = ?", (asset_id,))
+            }
+            updates = []
+            for metric, value in metrics.items():
+                agg = _update_trend(existing.get(metric), recorded_at, value, self.half_life_days)
+                updates.append((asset_id, metric, agg['n'], agg['origin_t'], agg['min_t'], agg['last_t'], agg['last_value'],
+                                agg['mean'], agg['m2'], agg['ewma'], agg['min_value'], agg['max_value'],
+                                agg['sum_t'], agg['sum_tt'], agg['sum_ty'], agg['decayed_w'], agg['decayed_t'],
+                                agg['decayed_tt'], agg['decayed_y'], agg['decayed_ty']))
+            conn.executemany(
+                "INSERT OR REPLACE INTO asset_trends (asset_id, metric, n, origin_t, min_t, last_t, last_value, mean, m2, "
+                "ewma, min_value, max_value, sum_t, sum_tt, sum_ty, decayed_w, decayed_t, decayed_tt, decayed_y, decayed_ty) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                updates,
+            )
+            return cur.lastrowid
+
+    def get_trends(self, asset_id: str, metric: Optional[str] = None) -> List[Dict]:
+        """读取设备的趋势聚合，可按指标过滤"""
+        with self._connect() as conn:
+            if metric:
+                rows = conn.execute("SELECT * FROM asset_trends WHERE asset_id = ? AND metric = ?", (asset_id, metric))
+            else:
+                rows = conn.execute("SELECT * FROM asset_trends WHERE asset_id = ? ORDER BY metric", (asset_id,))
+            return [summarize_trend(row) for row in rows]
+
+    def remaining_life(self, asset_id: str, metric: str, threshold: float, window: str = 'recent') -> Optional[Dict]:
+        """
+        按线性退化趋势外推指标到达阈值的剩余天数；指标不存在时返回 None。
+        window='recent'（默认）使用时间衰减加权的近期趋势，长期平稳后出现的退化能及时反映；
+        window='all' 使用全部记录的回归。
+        """
+        if window not in ('recent', 'all'):
+            raise ValueError(f"未知的趋势窗口: {window}")
+        trends = self.get_trends(asset_id, metric)
+        if not trends:
+            return None
+        trend = trends[0]
+
+        if window == 'recent':
+            slope, intercept = trend['recent_slope_per_day'], trend['recent_intercept']
+        else:
+            slope, intercept = trend['slope_per_day'], trend['intercept']
+        current_t = (trend['last_time'] - trend['regression_origin']) / SECONDS_PER_DAY
+        current = intercept + slope * current_t
+        if current >= threshold:
+            days = 0.0
+        elif slope > 0:
+            days = (threshold - current) / slope
+        else:
+            days = None  # 无退化趋势，无法外推
+        return {**trend, 'window': window, 'half_life_days': self.half_life_days, 'threshold': threshold,
+                'fitted_value': current, 'remaining_days': days}
+
+    def get_recordings(self, asset_id: str, limit: int = 100) -> List[Dict]:
+        """按时间倒序返回最近的记录"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM recordings WHERE asset_id = ? ORDER BY recorded_at DESC LIMIT ?", (asset_id, limit)
+            )
+            return [
+                {**dict(row), 'features': json.loads(row['features']), 'probabilities': json.loads(row['probabilities'])}
+                for row in rows
+            ]
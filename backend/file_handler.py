@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from file_structure import sniff_csv, plan_read_kwargs
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -9,9 +10,26 @@ def save_uploaded_file(file):
     file.save(filepath)
     return filepath
 
-def load_csv(filepath):
-    """尝试用 GBK 或 UTF-8 编码打开 CSV 文件"""
+def load_csv(filepath, plan=None):
+    """尝试用 GBK 或 UTF-8 编码打开 CSV 文件；传入读取方案时按方案只读取所需列"""
+    if plan is not None:
+        return pd.read_csv(filepath, **plan_read_kwargs(plan))
     try:
         return pd.read_csv(filepath, encoding='gbk', engine='python')
     except:
         return pd.read_csv(filepath, encoding='utf-8', engine='python')
+
+
+def load_csv_with_plan(filepath):
+    """
+    先嗅探表头生成读取方案，只解析加速度与采样频率列；
+    方案不可用（未识别到加速度列或解析失败）时退回整表解析。
+    返回 (DataFrame, 嗅探信息或 None)
+    """
+    try:
+        info = sniff_csv(filepath)
+        if info['accel_columns']:
+            return load_csv(filepath, info['plan']), info
+    except Exception as e:
+        print(f"[读取方案] {filepath} 按方案读取失败，改用整表解析: {e}")
+    return load_csv(filepath), None
@@ -1,59 +1,252 @@
-from typing import Dict, List, Optional
-import pandas as pd
-import json
-import os
-
-class FileStructureManager:
-    def __init__(self):
-        self.structure_template = {
-            "required_columns": [],
-            "optional_columns": [],
-            "column_types": {},
-            "column_descriptions": {}
-        }
-    
-    def analyze_file_structure(self, file_path: str) -> Dict:
-        """分析CSV文件结构并返回结构信息"""
-        try:
-            df = pd.read_csv(file_path, encoding='gbk', engine='python')
-        except:
-            df = pd.read_csv(file_path, encoding='utf-8', engine='python')
-        
-        structure = self.structure_template.copy()
-        structure["required_columns"] = list(df.columns)
-        structure["column_types"] = {col: str(df[col].dtype) for col in df.columns}
-        
-        return structure
-    
-    def save_structure_template(self, structure: Dict, template_name: str) -> str:
-        """保存文件结构模板"""
-        template_path = f"templates/{template_name}.json"
-        os.makedirs("templates", exist_ok=True)
-        
-        with open(template_path, 'w', encoding='utf-8') as f:
-            json.dump(structure, f, ensure_ascii=False, indent=2)
-        
-        return template_path
-    
-    def load_structure_template(self, template_name: str) -> Optional[Dict]:
-        """加载文件结构模板"""
-        template_path = f"templates/{template_name}.json"
-        try:
-            with open(template_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return None
-    
-    def validate_file_structure(self, file_path: str, template: Dict) -> tuple[bool, List[str]]:
-        """验证文件结构是否符合模板要求"""
-        try:
-            df = pd.read_csv(file_path, encoding='gbk', engine='python')
-        except:
-            df = pd.read_csv(file_path, encoding='utf-8', engine='python')
-        
-        missing_columns = []
-        for col in template["required_columns"]:
-            if col not in df.columns:
-                missing_columns.append(col)
-        
-        return len(missing_columns) == 0, missing_columns 
\ No newline at end of file
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import codecs
+import io
+import json
+import os
+import threading
+
+SNIFF_BYTES = 256 * 1024      # 结构嗅探最多读取的字节数
+SNIFF_ROWS = 200              # 用于推断 dtype 的样本行数
+CANDIDATE_ENCODINGS = ('utf-8-sig', 'gbk')
+CANDIDATE_DELIMITERS = (',', '\t', ';')
+SAMPLING_RATE_KEYWORDS = ('采样频率', '采样率', 'sampling', 'sample_rate', 'samplerate')
+
+
+def is_accel_column(col) -> bool:
+    """与分析接口保持一致的加速度列识别规则"""
+    return '加速度' in str(col) or str(col).strip() == 'value'
+
+
+def is_sampling_rate_column(col) -> bool:
+    name = str(col).strip().lower()
+    if is_accel_column(col):
+        return False
+    return name == 'fs' or any(key in name for key in SAMPLING_RATE_KEYWORDS)
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def _numeric_row(fields: List[str]) -> bool:
+    """非空字段中数值占多数即视为数据行"""
+    values = [f.strip() for f in fields if f.strip()]
+    if not values:
+        return False
+    numeric = sum(_is_number(v) for v in values)
+    return numeric > 0 and numeric * 2 >= len(values)
+
+
+def read_head_text(file_path: str, max_bytes: int = SNIFF_BYTES) -> Tuple[str, str, bool]:
+    """只读取文件头部字节并识别编码，返回 (文本, 编码, 是否已读到文件末尾)"""
+    with open(file_path, 'rb') as f:
+        head = f.read(max_bytes + 1)
+    at_eof = len(head) <= max_bytes
+    head = head[:max_bytes]
+
+    for encoding in CANDIDATE_ENCODINGS:
+        # 增量解码，避免截断处的多字节字符导致误判
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            return decoder.decode(head, final=at_eof), encoding, at_eof
+        except UnicodeDecodeError:
+            continue
+    return head.decode('latin-1'), 'latin-1', at_eof
+
+
+def sniff_delimiter(lines: List[str]) -> str:
+    tail = lines[-min(len(lines), 20):]
+    best, best_count = ',', 0
+    for sep in CANDIDATE_DELIMITERS:
+        counts = [line.count(sep) for line in tail]
+        # 取各行中最少的分隔符数，稳定出现的分隔符才可信
+        count = min(counts) if counts else 0
+        if count > best_count:
+            best, best_count = sep, count
+    return best
+
+
+def locate_header(rows: List[List[str]], lookahead: int = 5) -> Tuple[Optional[int], int]:
+    """定位表头行，返回 (表头行号或 None, 首个数据行号)"""
+    # 数据区行宽以末行为准，采样频率等只在首行填写的列允许末尾留空
+    width = len(rows[-1]) if rows else 0
+    for i in range(len(rows)):
+        run = rows[i:i + lookahead]
+        if run and all(len(r) >= width and _numeric_row(r) for r in run):
+            if i > 0 and len(rows[i - 1]) >= width and not _numeric_row(rows[i - 1]):
+                return i - 1, i
+            return None, i
+    return (0, 1) if rows else (None, 0)
+
+
+def sniff_csv(file_path: str, sample_rows: int = SNIFF_ROWS) -> Dict:
+    """
+    只读取表头和有限行样本，推断编码、表头偏移、列类型与采样频率，
+    返回可直接传给 pandas.read_csv 的读取方案。
+    """
+    text, encoding, at_eof = read_head_text(file_path)
+    raw_lines = [line.rstrip('\r') for line in text.split('\n')]
+    if not at_eof and raw_lines:
+        raw_lines = raw_lines[:-1]  # 最后一行可能被截断
+    # 空行不参与表头定位，但保留原始行号，pandas 的 skiprows 按原始行计数
+    line_numbers = [i for i, line in enumerate(raw_lines) if line.strip()]
+    lines = [raw_lines[i] for i in line_numbers]
+    if not lines:
+        raise ValueError('文件为空或无法识别表头')
+
+    sep = sniff_delimiter(lines)
+    rows = [line.split(sep) for line in lines]
+    header_row, data_row = locate_header(rows)
+
+    sample_text = '\n'.join(lines[data_row if header_row is None else header_row:][:sample_rows + 1])
+    sample = pd.read_csv(
+        io.StringIO(sample_text),
+        sep=sep,
+        header=None if header_row is None else 0,
+    )
+    columns = [str(c) for c in sample.columns]
+    sample.columns = columns
+
+    accel_columns = [c for c in columns if is_accel_column(c)]
+    rate_column = next((c for c in columns if is_sampling_rate_column(c)), None)
+
+    sampling_rate = None
+    if rate_column is not None:
+        rates = pd.to_numeric(sample[rate_column], errors='coerce').dropna()
+        if not rates.empty:
+            sampling_rate = float(rates.iloc[0])
+
+    column_types = {}
+    for col in columns:
+        if col in accel_columns or col == rate_column or pd.api.types.is_numeric_dtype(sample[col]):
+            column_types[col] = 'float64'
+        else:
+            column_types[col] = str(sample[col].dtype)
+
+    usecols = accel_columns + ([rate_column] if rate_column else [])
+    plan = {
+        'encoding': encoding,
+        'sep': sep,
+        'skiprows': line_numbers[header_row] if header_row is not None else line_numbers[data_row],
+        'header': 0 if header_row is not None else None,
+        'usecols': usecols,
+        'dtype': {c: 'float64' for c in usecols},
+    }
+    if header_row is None:
+        # 无表头时 pandas 以列序号作为列名
+        plan['usecols'] = [columns.index(c) for c in usecols]
+        plan['dtype'] = {columns.index(c): 'float64' for c in usecols}
+
+    return {
+        'columns': columns,
+        'column_types': column_types,
+        'accel_columns': accel_columns,
+        'sampling_rate_column': rate_column,
+        'sampling_rate': sampling_rate,
+        'header_row': line_numbers[header_row] if header_row is not None else None,
+        'data_line': line_numbers[data_row],
+        'plan': plan,
+    }
+
+
+def plan_read_kwargs(plan: Dict) -> Dict:
+    """将读取方案转换为 pandas.read_csv 参数"""
+    kwargs = {
+        'encoding': plan['encoding'],
+        'sep': plan.get('sep', ','),
+        'skiprows': plan.get('skiprows', 0),
+        'header': plan.get('header', 0),
+        'engine': 'c',
+    }
+    if plan.get('usecols'):
+        kwargs['usecols'] = plan['usecols']
+        kwargs['dtype'] = plan.get('dtype')
+    return kwargs
+
+
+class FileStructureManager:
+    def __init__(self, template_dir: str = 'templates'):
+        self.structure_template = {
+            "required_columns": [],
+            "optional_columns": [],
+            "column_types": {},
+            "column_descriptions": {}
+        }
+        self.template_dir = template_dir
+        # 模板名 -> (mtime_ns, size, 模板内容)
+        self._templates: Dict[str, Tuple[int, int, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _template_path(self, template_name: str) -> str:
+        return os.path.join(self.template_dir, f"{template_name}.json")
+
+    def analyze_file_structure(self, file_path: str) -> Dict:
+        """分析CSV文件结构并返回结构信息（只读取表头与样本行）"""
+        info = sniff_csv(file_path)
+
+        structure = self.structure_template.copy()
+        structure["required_columns"] = info["columns"]
+        structure["column_types"] = info["column_types"]
+        structure["ingest_plan"] = info["plan"]
+        structure["sampling_rate"] = info["sampling_rate"]
+
+        return structure
+
+    def build_ingest_plan(self, file_path: str) -> Dict:
+        """生成可供加载函数复用的读取方案"""
+        return sniff_csv(file_path)["plan"]
+
+    def save_structure_template(self, structure: Dict, template_name: str) -> str:
+        """保存文件结构模板"""
+        template_path = self._template_path(template_name)
+        os.makedirs(self.template_dir, exist_ok=True)
+
+        with open(template_path, 'w', encoding='utf-8') as f:
+            json.dump(structure, f, ensure_ascii=False, indent=2)
+
+        stat = os.stat(template_path)
+        with self._lock:
+            self._templates[template_name] = (stat.st_mtime_ns, stat.st_size, structure)
+
+        return template_path
+
+    def load_structure_template(self, template_name: str) -> Optional[Dict]:
+        """加载文件结构模板，文件未变化时直接返回内存中的副本"""
+        template_path = self._template_path(template_name)
+        try:
+            stat = os.stat(template_path)
+        except OSError:
+            with self._lock:
+                self._templates.pop(template_name, None)
+            return None
+
+        with self._lock:
+            cached = self._templates.get(template_name)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                template = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._templates[template_name] = (stat.st_mtime_ns, stat.st_size, template)
+        return template
+
+    def validate_file_structure(self, file_path: str, template: Dict) -> tuple[bool, List[str]]:
+        """验证文件结构是否符合模板要求（只读取表头）"""
+        columns = set(sniff_csv(file_path)["columns"])
+
+        missing_columns = []
+        for col in template["required_columns"]:
+            if col not in columns:
+                missing_columns.append(col)
+
+        return len(missing_columns) == 0, missing_columns
@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.signal import firwin, hilbert, lfilter
+
+FILTER_TAPS = 16
+FILTER_CUTOFF = 0.4          # 原型低通截止频率（相对 Nyquist）
+MIN_BAND_SAMPLES = 256       # 最细一层每个子带至少保留的采样点数
+
+
+def _analytic_filters():
+    """由低通原型调制得到中心位于 fs/8 与 3fs/8 的复解析滤波器"""
+    h = firwin(FILTER_TAPS, FILTER_CUTOFF)
+    n = np.arange(FILTER_TAPS)
+    return h * np.exp(2j * np.pi * n * 0.125), h * np.exp(2j * np.pi * n * 0.375)
+
+
+def _spectral_kurtosis(c):
+    """复包络的谱峭度，高斯噪声约为 0"""
+    c = c[FILTER_TAPS:] if len(c) > 4 * FILTER_TAPS else c
+    power = np.abs(c) ** 2
+    mean_power = np.mean(power)
+    if mean_power <= 0:
+        return 0.0
+    return float(np.mean(power ** 2) / mean_power ** 2 - 2.0)
+
+
+def fast_kurtogram(signal, sampling_rate, max_level=None):
+    """
+    快速谱峭度图（二叉树多速率滤波器组）。
+    每层把上一层各子带分为高低两半并 2 倍抽取，单层代价 O(N)，总代价 O(N log N)。
+    返回 (各层谱峭度列表，第 L 层含 2^L 个子带; 最优频带信息)。
+    """
+    x = np.asarray(signal, dtype=float)
+    x = x - np.mean(x)
+    levels = max(int(np.log2(max(len(x), 1))) - int(np.log2(MIN_BAND_SAMPLES)), 0)
+    if max_level is not None:
+        levels = min(levels, max_level)
+
+    h_low, h_high = _analytic_filters()
+    kurtogram = [[_spectral_kurtosis(hilbert(x))]]
+    nodes = [x + 0j]
+    for _ in range(levels):
+        children = []
+        for c in nodes:
+            low = lfilter(h_low, 1, c)[1::2]
+            high = lfilter(h_high, 1, c)[1::2]
+            # 高半带抽取后落在负频率，平移 r/2 使各子带内容统一位于 [0, r/2)
+            children.append(low)
+            children.append(high * (-1.0) ** np.arange(len(high)))
+        nodes = children
+        kurtogram.append([_spectral_kurtosis(c) for c in nodes])
+
+    best_level, best_index, best_value = 0, 0, kurtogram[0][0]
+    for level, row in enumerate(kurtogram):
+        for index, value in enumerate(row):
+            if value > best_value:
+                best_level, best_index, best_value = level, index, value
+
+    bandwidth = sampling_rate / 2 / (2 ** best_level)
+    low_freq = best_index * bandwidth
+    band = {
+        'level': best_level,
+        'index': best_index,
+        'low': float(low_freq),
+        'high': float(low_freq + bandwidth),
+        'center': float(low_freq + bandwidth / 2),
+        'bandwidth': float(bandwidth),
+        'kurtosis': float(best_value),
+    }
+    return kurtogram, band
+
+
+def compact_kurtogram(kurtogram, digits=4):
+    """四舍五入后的谱峭度矩阵，便于随接口返回"""
+    return [[round(v, digits) for v in row] for row in kurtogram]
+
+
+def band_envelope(signal, sampling_rate, low, high):
+    """频域带通并解调，返回原采样率下该频带的包络"""
+    x = np.asarray(signal, dtype=float)
+    N = len(x)
+    X = np.fft.fft(x - np.mean(x))
+    freqs = np.fft.fftfreq(N, d=1 / sampling_rate)
+    # 只保留正频率的目标频带并乘 2，得到该频带的解析信号
+    mask = (freqs >= low) & (freqs <= high) & (freqs > 0)
+    analytic = np.fft.ifft(np.where(mask, 2 * X, 0))
+    return np.abs(analytic)
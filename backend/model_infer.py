@@ -1,3 +1,4 @@
+import os
 import torch
 import torch.nn as nn
 import numpy as np
@@ -73,23 +74,42 @@ def imf_make_unify(data, imfs_unify=7):
         pad = np.zeros((imfs_unify - len(IMFs), IMFs.shape[1]))
         return np.vstack((IMFs, pad))
 
-def preprocess_csv(filepath):
+MODEL_SKIPROWS = 10
+
+def load_model_frame(filepath, df=None, data_line=0):
     """
-    输入：原始csv文件路径
-    输出：shape = (batch, 7, 1024) 的 numpy 数组
-    - 已集成健壮的CSV加载来解决编码和数据类型错误。
+    模型输入表：与训练时一致，跳过文件前 MODEL_SKIPROWS 行、不带表头读取全部列。
+    调用方已按读取方案解析过文件时，传入 df 及其首个数据行在文件中的行号 data_line，
+    按相同起点对齐行，避免重复解析。
     """
-    try:
-        # 1. 使用pandas健壮地加载CSV
+    if df is None:
+        # 使用pandas健壮地加载CSV
         #    - `encoding='gbk'`：解决编码错误
         #    - `skiprows=10`：跳过文件顶部的文本表头，解决DtypeWarning
-        df = pd.read_csv(
+        return pd.read_csv(
             filepath,
             header=None,
             encoding='gbk',
-            skiprows=10, 
+            skiprows=MODEL_SKIPROWS,
             low_memory=False
         )
+
+    offset = MODEL_SKIPROWS - data_line
+    if offset >= 0:
+        return df.iloc[offset:]
+    # 数据起点晚于第 MODEL_SKIPROWS 行时，整表读取会把中间的表头行读成非数值行（随后按 0 填充）
+    padding = pd.DataFrame(np.nan, index=range(-offset), columns=df.columns)
+    return pd.concat([padding, df], ignore_index=True)
+
+def preprocess_csv(filepath, df=None, data_line=0):
+    """
+    输入：原始csv文件路径；调用方已读入数据表时可通过 df 与 data_line 传入，避免重复解析
+    输出：shape = (batch, 7, 1024) 的 numpy 数组
+    - 已集成健壮的CSV加载来解决编码和数据类型错误。
+    """
+    try:
+        # 1. 加载与训练时相同起点的数据
+        df = load_model_frame(filepath, df, data_line)
         # 将所有数据转换为数值，无法转换的变为NaN，然后用0填充
         df_numeric = df.apply(pd.to_numeric, errors='coerce').fillna(0)
 
@@ -132,7 +152,21 @@ def preprocess_csv(filepath):
     return emd_samples
 
 # ------------------ 3. 推理主函数 ------------------
-def predict(filepath):
+# 诊断类别中文名称
+FAULT_LABELS = {
+    0: "正常", 1: "7mm内圈故障", 2: "7mm滚动体故障", 3: "7mm外圈故障", 4: "14mm内圈故障",
+    5: "14mm滚动体故障", 6: "14mm外圈故障", 7: "21mm内圈故障", 8: "21mm滚动体故障", 9: "21mm外圈故障",
+}
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'best_model_emd_cnn_transformer_1.pt')
+_model = None
+
+def load_model():
+    """加载模型权重，同一进程内只加载一次"""
+    global _model
+    if _model is not None:
+        return _model
+
     # 模型参数
     batch_size = 32
     input_dim = 7 * 8
@@ -146,11 +180,17 @@ def predict(filepath):
     # 加载模型
     model = EMDCNNTransformer(batch_size, input_dim, conv_archs, output_dim, hidden_dim, num_layers, num_heads, dropout_rate)
     torch.serialization.add_safe_globals({'EMDCNNTransformer': EMDCNNTransformer})
-    model.load_state_dict(torch.load('best_model_emd_cnn_transformer_1.pt', map_location='cpu', weights_only=False))
+    model.load_state_dict(torch.load(MODEL_PATH, map_location='cpu', weights_only=False))
     model.eval()
+    _model = model
+    return model
+
+def predict(filepath, df=None, data_line=0):
+    batch_size = 32
+    model = load_model()
 
     # 数据预处理
-    emd_samples = preprocess_csv(filepath)  # (batch, 7, 1024)
+    emd_samples = preprocess_csv(filepath, df, data_line)  # (batch, 7, 1024)
     # 转为 torch tensor
     x = torch.tensor(emd_samples, dtype=torch.float32)
     # 变形为 (batch, 7*8, 128)
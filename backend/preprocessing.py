@@ -8,6 +8,107 @@ def clean_signal(signal):
     signal = signal[abs(signal) < 10]  # 默认过滤 ±10g 外的极值
     return signal
 
+# 轴承状态指标，键名与诊断数据中的 features 字段一致
+INDICATOR_LABELS = {
+    "mean": "均值",
+    "std": "标准差",
+    "rms": "均方根",
+    "peak": "峰值",
+    "peak_to_peak": "峰峰值",
+    "crest_factor": "峰值因子",
+    "impulse_factor": "脉冲因子",
+    "shape_factor": "波形因子",
+    "clearance_factor": "裕度因子",
+    "kurtosis": "峭度",
+    "skewness": "偏度",
+}
+
+
+def stack_axes(signals):
+    """将多个（可能不等长的）单轴信号堆叠为 (轴数, 采样点) 数组，不足部分以 NaN 补齐"""
+    signals = [np.asarray(s, dtype=float) for s in signals]
+    length = max((len(s) for s in signals), default=0)
+    data = np.full((len(signals), length), np.nan)
+    for i, s in enumerate(signals):
+        data[i, :len(s)] = s
+    return data
+
+
+def _safe_div(num, den):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / np.where(den > 0, den, 1.0), 0.0)
+
+
+def _indicators_along_last_axis(x):
+    """沿最后一维计算全部状态指标，NaN 视为缺失值"""
+    valid = np.isfinite(x)
+    n = valid.sum(axis=-1).astype(float)
+    x0 = np.where(valid, x, 0.0)
+    ax = np.abs(x0)
+
+    mean = _safe_div(x0.sum(axis=-1), n)
+    d = np.where(valid, x - mean[..., np.newaxis], 0.0)
+    d2 = d * d
+    m2 = _safe_div(d2.sum(axis=-1), n)
+    m3 = _safe_div((d2 * d).sum(axis=-1), n)
+    m4 = _safe_div((d2 * d2).sum(axis=-1), n)
+
+    rms = np.sqrt(_safe_div((x0 * x0).sum(axis=-1), n))
+    abs_mean = _safe_div(ax.sum(axis=-1), n)
+    sqrt_mean = _safe_div(np.sqrt(ax).sum(axis=-1), n)
+    peak = np.where(n > 0, ax.max(axis=-1, initial=0.0), 0.0)
+    x_max = np.where(valid, x, -np.inf).max(axis=-1, initial=-np.inf)
+    x_min = np.where(valid, x, np.inf).min(axis=-1, initial=np.inf)
+    peak_to_peak = np.where(n > 0, x_max - x_min, 0.0)
+
+    # 与 pandas 的 kurtosis()/skew() 一致：无偏超额峭度与调整后偏度
+    g1 = _safe_div(m3, m2 ** 1.5)
+    g2 = _safe_div(m4, m2 ** 2) - 3.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skewness = np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+        kurtosis = np.where(n > 3, (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6.0), np.nan)
+    constant = m2 <= 1e-14 * np.maximum(mean * mean, 1.0)
+    skewness = np.where(constant & (n > 2), 0.0, skewness)
+    kurtosis = np.where(constant & (n > 3), 0.0, kurtosis)
+
+    indicators = {
+        "mean": mean,
+        "std": np.sqrt(m2),
+        "rms": rms,
+        "peak": peak,
+        "peak_to_peak": peak_to_peak,
+        "crest_factor": _safe_div(peak, rms),
+        "impulse_factor": _safe_div(peak, abs_mean),
+        "shape_factor": _safe_div(rms, abs_mean),
+        "clearance_factor": _safe_div(peak, sqrt_mean ** 2),
+        "kurtosis": kurtosis,
+        "skewness": skewness,
+    }
+    # 没有有效点的轴或窗口（如不等长轴的补齐部分）所有指标均为 NaN
+    empty = n == 0
+    return {key: np.where(empty, np.nan, values) for key, values in indicators.items()}
+
+
+def extract_indicators(data, window=None):
+    """
+    多轴状态指标提取，输入 (轴数, 采样点) 数组，一次向量化计算全部指标。
+    window 为 None 时每个指标返回 (轴数,) 数组；
+    指定 window 时按不重叠窗口计算，返回 (轴数, 窗口数) 数组。
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    if window is None:
+        return _indicators_along_last_axis(data)
+
+    n_windows = data.shape[1] // window
+    frames = data[:, :n_windows * window].reshape(data.shape[0], n_windows, window)
+    return _indicators_along_last_axis(frames)
+
+
+def indicators_for_axis(indicators, index):
+    """取出某一轴的指标，转为 {指标名: float}"""
+    return {key: float(values[index]) for key, values in indicators.items()}
+
+
 def compute_rms(signal, window=200):
     """滑动 RMS 值计算"""
     signal = np.array(signal)
@@ -16,16 +117,6 @@ def compute_rms(signal, window=200):
     return [np.sqrt(np.mean(signal[i:i+window] ** 2)) 
             for i in range(len(signal) - window + 1)]
 
-def compute_stats(signal):
-    """统计特征值：均值、标准差、峭度、偏度"""
-    signal = np.array(signal)
-    return [
-        {"name": "均值", "value": float(np.mean(signal))},
-        {"name": "标准差", "value": float(np.std(signal))},
-        {"name": "峭度", "value": float(pd.Series(signal).kurtosis())},
-        {"name": "偏度", "value": float(pd.Series(signal).skew())}
-    ]
-
 def compute_moving_mean(signal, window=200):
     """滑动均值"""
     signal = np.array(signal)
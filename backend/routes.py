@@ -1,16 +1,14 @@
 # -------------------- routes.py (完整版) --------------------
 
-from flask import Blueprint, request, jsonify
-import pandas as pd
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import numpy as np
 import os
-import requests
 from datetime import datetime, timedelta, timezone
 import io
 import base64
 
 # SciPy and other science libs
-from scipy.signal import hilbert, stft
+from scipy.signal import stft
 try:
     from vmdpy import VMD
 except ImportError:
@@ -22,19 +20,22 @@ except ImportError:
 
 # Your local modules
 # (Please ensure these files and functions exist in your project)
-from file_handler import save_uploaded_file, load_csv
+from file_handler import save_uploaded_file, load_csv_with_plan
 from analyzer import analyze_dataframe
 from preprocessing import clean_signal
-try:
-    from preprocessing import clean_signal_robust
-except ImportError:
-    clean_signal_robust = clean_signal # Fallback
-from model_infer import predict
+from model_infer import predict, FAULT_LABELS
+from kurtogram import compact_kurtogram, fast_kurtogram
+from spectrum import build_feature_freqs, compute_spectrum, impulsive_segment, match_feature_marks, robust_segment
 from file_structure import FileStructureManager
+from ai_report import ReportClient, ReportBusyError, sse_event
+from feature_history import FeatureHistory, DEFAULT_DB_PATH, TREND_HALF_LIFE_DAYS
 
 
 api = Blueprint('api', __name__)
 file_structure_manager = FileStructureManager()
+report_client = ReportClient.from_env()
+feature_history = FeatureHistory(os.getenv('FEATURE_HISTORY_DB', DEFAULT_DB_PATH),
+                                 float(os.getenv('FEATURE_TREND_HALF_LIFE_DAYS', TREND_HALF_LIFE_DAYS)))
 
 @api.route('/analyze', methods=['POST'])
 def analyze_file():
@@ -51,7 +52,8 @@ def analyze_file():
 
         filepath = save_uploaded_file(file)
         filename = file.filename
-        df = load_csv(filepath)
+        df, structure = load_csv_with_plan(filepath)
+        columns = structure['columns'] if structure else [str(c) for c in df.columns]
 
         # === Part 1: 时域分析 (生成图表数据) ===
         sampling_rate_str = request.form.get('samplingRate')
@@ -60,7 +62,7 @@ def analyze_file():
         window = int(request.form.get('window', 200))
 
         # 调用您原始的核心分析函数
-        time_domain_results, err = analyze_dataframe(df, sampling_rate, window)
+        time_domain_results, model_features, err = analyze_dataframe(df, sampling_rate, window)
         if err:
             return jsonify({'error': err}), 400
 
@@ -69,36 +71,31 @@ def analyze_file():
         label = pred_result['label'][0]
         prob_list = pred_result['prob'][0]
         
-        label_mapping = {
-            0: "正常", 1: "7mm内圈故障", 2: "7mm滚动体故障", 3: "7mm外圈故障", 4: "14mm内圈故障",
-            5: "14mm滚动体故障", 6: "14mm外圈故障", 7: "21mm内圈故障", 8: "21mm滚动体故障", 9: "21mm外圈故障",
-        }
-        probabilities = [{"label": label_mapping.get(i, str(i)), "value": float(p)} for i, p in enumerate(prob_list)]
+        probabilities = [{"label": FAULT_LABELS.get(i, str(i)), "value": float(p)} for i, p in enumerate(prob_list)]
         confidence = float(prob_list[label])
-        faultType = label_mapping.get(label, str(label))
+        faultType = FAULT_LABELS.get(label, str(label))
 
         china_tz = timezone(timedelta(hours=8))
         diagnosis_time = datetime.now(china_tz).strftime('%Y-%m-%d %H:%M:%S %Z')
 
-        model_features = {}
-        for col_name in df.columns:
-            try:
-                arr = pd.to_numeric(df[col_name], errors='coerce').dropna()
-                if not arr.empty:
-                    model_features[str(col_name)] = {
-                        'mean': float(arr.mean()), 'std': float(arr.std()),
-                        'kurtosis': float(arr.kurtosis()), 'skewness': float(arr.skew()),
-                    }
-            except Exception:
-                continue
-
         structured_data = {
             'diagnosis': {'result': faultType, 'confidence': confidence, 'probabilities': probabilities},
             'features': model_features,
-            'file_info': {'filename': filename, 'columns': [str(c) for c in df.columns]},
+            'file_info': {'filename': filename, 'columns': columns},
             'diagnosis_time': diagnosis_time
         }
 
+        # 指定设备编号时写入特征历史，供趋势与剩余寿命查询
+        asset_id = request.form.get('assetId')
+        if asset_id and asset_id.strip():
+            try:
+                feature_history.record(asset_id.strip(), model_features, probabilities,
+                                       predicted_class=faultType, confidence=confidence, filename=filename)
+            except Exception:
+                # 历史写入失败（如数据库被锁定）不影响本次诊断结果返回
+                import traceback
+                traceback.print_exc()
+
         return jsonify({
             "success": True, 
             "results": time_domain_results,
@@ -118,7 +115,7 @@ def analyze_spectrum():
 
         file = request.files['file']
         filepath = save_uploaded_file(file)
-        df = load_csv(filepath)
+        df, _ = load_csv_with_plan(filepath)
 
         sampling_rate = float(request.form.get('samplingRate', 1024.0))
 
@@ -132,8 +129,9 @@ def analyze_spectrum():
             "滚动体": parse_freq(request.form.get("ballFreq"))
         }
 
-        multiples = [1, 2, 3]
-        feature_freq_list = [{"type": name, "freq": round(base * m, 2)} for name, base in base_freqs.items() if base for m in multiples]
+        feature_freq_list = build_feature_freqs(base_freqs)
+        # 默认按快速谱峭度图自动选择解调频带，kurtogram=0 时使用全频带包络
+        use_kurtogram = request.form.get('kurtogram', '1') != '0'
 
         accel_cols = [col for col in df.columns if '加速度' in str(col) or str(col).strip() == 'value']
         if not accel_cols:
@@ -141,41 +139,26 @@ def analyze_spectrum():
 
         results = []
         for col in accel_cols:
-            raw = clean_signal_robust(df[col].astype(float))
-            sig = np.array(raw[:4096])
+            sig = robust_segment(df[col].astype(float))
             if len(sig) < 100: continue
 
-            N = len(sig)
-            freqs_full = np.fft.rfftfreq(N, d=1 / sampling_rate)
-            spec_full = np.abs(np.fft.rfft(sig))
-            freqs, spectrum = freqs_full[1:], spec_full[1:]
+            # 选带与解调都用未经 Hampel 滤波的同一段信号，Hampel 清洗后的 sig 只用于幅值谱
+            band, kurtogram, raw = None, None, None
+            if use_kurtogram:
+                raw = impulsive_segment(df[col].astype(float))
+                kurtogram, band = fast_kurtogram(raw, sampling_rate)
 
+            freqs, spectrum, env_spec = compute_spectrum(sig, sampling_rate, band, raw)
             results.append({'type': 'fft', 'axis': f"{col} 频谱", 'data': [(float(f), float(a)) for f, a in zip(freqs, spectrum)]})
+            if env_spec is None: continue
 
-            envelope = np.abs(hilbert(sig))
-            envelope = clean_signal_robust(envelope)
-            if len(envelope) < 10: continue
-
-            env_spec_full = np.abs(np.fft.rfft(envelope))
-            env_spec, freqs_env = env_spec_full[1:], freqs_full[1:]
-            
-            step = freqs_env[1] - freqs_env[0] if len(freqs_env) > 1 else 1.0
-            tolerance = max(step * 5, 5.0)
-
-            marks = []
-            for item in feature_freq_list:
-                f = item["freq"]
-                candidates = [(i, fr, amp) for i, (fr, amp) in enumerate(zip(freqs_env, env_spec)) if abs(fr - f) < tolerance]
-                if not candidates: continue
-                
-                i_best, fr_best, amp_best = min(candidates, key=lambda x: abs(x[1] - f))
-                if amp_best < 1e-2 or abs(fr_best - f) > tolerance * 0.6: continue
-                
-                base = base_freqs.get(item["type"]) or 1.0
-                label = f"{col} - {item['type']} {round(f / base, 1):.0f}X ({f:.2f}Hz)"
-                marks.append({"freq": fr_best, "amp": amp_best, "name": label})
-
-            results.append({'type': 'envelope', 'axis': f"{col} 包络谱", 'data': [(float(f), float(a)) for f, a in zip(freqs_env, env_spec)], 'featureMarks': marks})
+            marks = match_feature_marks(freqs, env_spec, feature_freq_list, base_freqs, col)
+            envelope = {'type': 'envelope', 'axis': f"{col} 包络谱", 'data': [(float(f), float(a)) for f, a in zip(freqs, env_spec)], 'featureMarks': marks}
+            if band:
+                envelope['axis'] = f"{col} 包络谱（解调频带 {band['low']:.0f}-{band['high']:.0f}Hz）"
+                envelope['band'] = band
+                envelope['kurtogram'] = compact_kurtogram(kurtogram)
+            results.append(envelope)
 
         return jsonify({'success': True, 'results': results})
 
@@ -190,7 +173,7 @@ def analyze_stft():
         if 'file' not in request.files: return jsonify({'error': '未上传文件'}), 400
         file = request.files['file']
         filepath = save_uploaded_file(file)
-        df = load_csv(filepath)
+        df, _ = load_csv_with_plan(filepath)
 
         sampling_rate = float(request.form.get('samplingRate', 1024.0))
         accel_cols = [col for col in df.columns if '加速度' in str(col) or str(col).strip() == 'value']
@@ -220,7 +203,7 @@ def analyze_vmd():
     try:
         file = request.files['file']
         filepath = save_uploaded_file(file)
-        df = load_csv(filepath)
+        df, _ = load_csv_with_plan(filepath)
         sampling_rate = float(request.form.get('samplingRate', 1024))
         
         col = [c for c in df.columns if '加速度' in str(c) or str(c).strip() == 'value'][0]
@@ -246,7 +229,7 @@ def analyze_cwt():
     try:
         file = request.files['file']
         filepath = save_uploaded_file(file)
-        df = load_csv(filepath)
+        df, _ = load_csv_with_plan(filepath)
         sampling_rate = float(request.form.get('samplingRate', 1024))
 
         col = [c for c in df.columns if '加速度' in str(c) or str(c).strip() == 'value'][0]
@@ -339,66 +322,65 @@ def validate_structure():
     except Exception as e:
         return jsonify({"error": f"服务端异常: {str(e)}"}), 500
 
+@api.route('/history/<asset_id>/trend', methods=['GET'])
+def history_trend(asset_id):
+    try:
+        trends = feature_history.get_trends(asset_id, request.args.get('metric'))
+        return jsonify({"success": True, "asset_id": asset_id, "trends": trends})
+    except Exception as e:
+        return jsonify({"error": f"服务端异常: {str(e)}"}), 500
+
+@api.route('/history/<asset_id>/remaining-life', methods=['GET'])
+def history_remaining_life(asset_id):
+    try:
+        metric = request.args.get('metric')
+        threshold = request.args.get('threshold', type=float)
+        window = request.args.get('window', 'recent')
+        if not metric or threshold is None: return jsonify({'error': '缺少指标名称或阈值'}), 400
+        if window not in ('recent', 'all'): return jsonify({'error': "window 只能为 recent 或 all"}), 400
+        result = feature_history.remaining_life(asset_id, metric, threshold, window)
+        if result is None: return jsonify({'error': '该设备无此指标的历史记录'}), 404
+        return jsonify({"success": True, "asset_id": asset_id, "remaining_life": result})
+    except Exception as e:
+        return jsonify({"error": f"服务端异常: {str(e)}"}), 500
+
+@api.route('/history/<asset_id>/recordings', methods=['GET'])
+def history_recordings(asset_id):
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify({"success": True, "asset_id": asset_id, "recordings": feature_history.get_recordings(asset_id, limit)})
+    except Exception as e:
+        return jsonify({"error": f"服务端异常: {str(e)}"}), 500
+
 @api.route('/ai-report', methods=['POST'])
 def ai_report():
     try:
         structured_data = request.get_json()
-        api_key = os.getenv('DEEPSEEK_API_KEY', 'sk-fd4e32d3c8a04f6d8674f9cbad867320') # Fallback key for convenience
-        if not api_key: raise RuntimeError('DEEPSEEK_API_KEY 未配置')
-        
-        system_prompt = """你是工业设备故障诊断领域的 AI 专家。
-请根据以下提供的信息生成一份结构化的诊断报告，格式必须固定为以下七个部分标题，每一部分按顺序输出：
----
-一、数据摘要
-二、可能故障原因分析
-三、问题严重性评估
-四、建议排查步骤
-五、推荐解决方案
-六、预防性维护建议
-七、备注
-【格式要求】：
-1. 【非常重要】禁止使用任何Markdown格式化标记，例如“##”、“-”、“*”、“**”等。所有内容都必须是纯文本。
-2. 所有内容以"工程报告风格"编写，禁止使用对话语气。
-3. 第三部分"问题严重性评估"必须采用如下卡片式格式，不允许使用表格线或竖线（|）：
-
-【立即停机】
-等级：紧急
-原因：持续运行将导致轴承完全失效
-
-【维修紧迫性】
-等级：紧急
-原因：振动能量持续升高，可能造成轴系损伤
-
-【设备安全性】
-等级：危险
-原因：多参数严重超标，可能引发连锁故障
-
-【生产影响】
-等级：严重
-原因：剩余寿命预计 <24 小时，基于峭度指标恶化速率预测
-
-4. 所有标题和项目必须严格输出，不可省略，不可变换顺序。
-5. 最终内容必须适合直接用于 PDF 报告生成或在网页中美观展示。
-"""
-        diagnosis = structured_data.get('diagnosis', {})
-        features = structured_data.get('features', {})
-        file_info = structured_data.get('file_info', {})
-        diagnosis_time = structured_data.get('diagnosis_time', '')
-        user_prompt = f"""以下是待诊断的设备故障信息：\n- 诊断时间: {diagnosis_time}\n- 文件名: {file_info.get('filename', '未知')}\n- 数据列: {', '.join(file_info.get('columns', []))}\n- 诊断结论: {diagnosis.get('result', '未知')}\n- 置信度: {diagnosis.get('confidence', '未知')}\n- 各类别概率分布: {', '.join([f"{p['label']} {p['value']:.2f}" for p in diagnosis.get('probabilities', [])])}\n- 统计特征: {features if features else '无'}\n\n请根据以上信息，结合你的领域知识，生成标准化诊断报告。【注意】报告最后的“报告生成时间”请严格填写为：{diagnosis_time}，不要用你自己的时间。"""
-
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-            "max_tokens": 1800, "temperature": 0.5
-        }
-        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
-        response = requests.post('https://api.deepseek.com/chat/completions', json=payload, headers=headers, timeout=60)
-        response.raise_for_status()
-        
-        ai_report_text = response.json().get('choices', [{}])[0].get('message', {}).get('content', '').strip()
+        ai_report_text = report_client.generate(structured_data)
         return jsonify({"success": True, "ai_report": ai_report_text})
 
+    except ReportBusyError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)})
+
+@api.route('/ai-report/stream', methods=['POST'])
+def ai_report_stream():
+    """以 server-sent events 逐段推送报告文本"""
+    structured_data = request.get_json()
+    if not structured_data: return jsonify({'error': '缺少诊断数据'}), 400
+
+    def events():
+        try:
+            for delta in report_client.stream(structured_data):
+                yield sse_event({'delta': delta})
+            yield sse_event({'success': True}, event='done')
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event({'success': False, 'error': str(e)}, event='error')
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
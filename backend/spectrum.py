@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import hilbert
+
+from kurtogram import band_envelope
+from preprocessing import clean_signal_robust
+
+FEATURE_MULTIPLES = [1, 2, 3]
+SPECTRUM_POINTS = 4096
+HAMPEL_WINDOW = 20
+
+
+def robust_segment(signal, points=SPECTRUM_POINTS):
+    """
+    取前 points 个有效点做 Hampel 清洗。只多保留一个滤波窗口的数据，
+    结果与先清洗整段再截取相同，但不必遍历整条记录。
+    """
+    signal = pd.Series(signal).dropna()
+    signal = signal[np.isfinite(signal)]
+    return np.array(clean_signal_robust(signal.values[:points + HAMPEL_WINDOW], hampel_window=HAMPEL_WINDOW)[:points])
+
+
+def impulsive_segment(signal, points=SPECTRUM_POINTS, clip_range=10):
+    """
+    只去除 NaN/inf 并限幅的前 points 个点。Hampel 滤波会把冲击当作离群值替换掉，
+    谱峭度选带与该频带的包络解调都需要保留这些冲击。
+    """
+    signal = pd.Series(signal).dropna()
+    signal = signal[np.isfinite(signal)]
+    return np.clip(signal.values[:points], -clip_range, clip_range)
+
+
+def build_feature_freqs(base_freqs, multiples=FEATURE_MULTIPLES):
+    """由内圈/外圈/滚动体故障基频生成倍频列表"""
+    return [{"type": name, "freq": round(base * m, 2)} for name, base in base_freqs.items() if base for m in multiples]
+
+
+def compute_spectrum(sig, sampling_rate, band=None, band_signal=None):
+    """
+    幅值谱与包络谱，均去掉直流分量；包络过短时包络谱返回 None。
+    未指定 band 时对 sig 求全频带 Hilbert 包络并做 Hampel 清洗；
+    指定 band（含 low/high，单位 Hz）时对 band_signal（与 sig 同一段、未经 Hampel 滤波，缺省为 sig）
+    带通解调，包络不再清洗，以免削去故障冲击形成的包络峰。
+    """
+    N = len(sig)
+    freqs_full = np.fft.rfftfreq(N, d=1 / sampling_rate)
+    spec_full = np.abs(np.fft.rfft(sig))
+    freqs, spectrum = freqs_full[1:], spec_full[1:]
+
+    if band is None:
+        envelope = clean_signal_robust(np.abs(hilbert(sig)))
+    else:
+        source = sig if band_signal is None else band_signal
+        envelope = band_envelope(source, sampling_rate, band['low'], band['high'])
+    if len(envelope) < 10:
+        return freqs, spectrum, None
+
+    env_spec_full = np.abs(np.fft.rfft(envelope))
+    return freqs, spectrum, env_spec_full[1:]
+
+
+def match_feature_marks(freqs_env, env_spec, feature_freq_list, base_freqs, col):
+    """在包络谱中查找最接近各故障特征频率的谱峰"""
+    step = freqs_env[1] - freqs_env[0] if len(freqs_env) > 1 else 1.0
+    tolerance = max(step * 5, 5.0)
+
+    marks = []
+    for item in feature_freq_list:
+        f = item["freq"]
+        candidates = np.flatnonzero(np.abs(freqs_env - f) < tolerance)
+        if not len(candidates): continue
+
+        i_best = candidates[np.argmin(np.abs(freqs_env[candidates] - f))]
+        fr_best, amp_best = freqs_env[i_best], env_spec[i_best]
+        if amp_best < 1e-2 or abs(fr_best - f) > tolerance * 0.6: continue
+
+        base = base_freqs.get(item["type"]) or 1.0
+        label = f"{col} - {item['type']} {round(f / base, 1):.0f}X ({f:.2f}Hz)"
+        marks.append({"freq": float(fr_best), "amp": float(amp_best), "name": label})
+    return marks
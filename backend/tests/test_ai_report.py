@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_report import ReportBusyError, ReportCache, ReportClient, canonical_hash
+
+STREAM_TOKENS = ['一、', '数据', '摘要']
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟 chat/completions 接口，支持普通与流式响应"""
+    protocol_version = 'HTTP/1.1'
+    send_done = True
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.calls.append((self.client_address, body))
+
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for token in STREAM_TOKENS:
+                event = {'choices': [{'delta': {'content': token}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if self.send_done:
+                self._chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            out = json.dumps({'choices': [{'message': {'content': ' 诊断报告 '}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+
+class ReportClientTest(unittest.TestCase):
+    def setUp(self):
+        StubHandler.send_done = True
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.calls = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = self.make_client()
+        self.data = {
+            'diagnosis': {'result': '正常', 'confidence': 0.9, 'probabilities': [{'label': '正常', 'value': 0.9}]},
+            'features': {'X轴加速度(g)': {'rms': 0.1}},
+            'diagnosis_time': '2024-01-01 00:00:00',
+        }
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_client(self, **kwargs):
+        return ReportClient(endpoint=f'http://127.0.0.1:{self.server.server_port}/chat/completions',
+                            api_key='test-key', **kwargs)
+
+    def test_generate_is_cached_on_canonical_payload(self):
+        self.assertEqual(self.client.generate(self.data), '诊断报告')
+        reordered = dict(reversed(list(self.data.items())))
+        self.assertEqual(canonical_hash(reordered), canonical_hash(self.data))
+        self.assertEqual(self.client.generate(reordered), '诊断报告')
+        self.assertEqual(len(self.server.calls), 1)
+
+    def test_connection_is_reused(self):
+        self.client.generate(self.data)
+        self.client.generate(dict(self.data, diagnosis_time='2024-01-02 00:00:00'))
+        ports = {address[1] for address, _ in self.server.calls}
+        self.assertEqual(len(ports), 1)
+
+    def test_stream_yields_tokens_then_serves_from_cache(self):
+        self.assertEqual(list(self.client.stream(self.data)), STREAM_TOKENS)
+        self.assertTrue(self.server.calls[0][1]['stream'])
+        self.assertEqual(list(self.client.stream(self.data)), [''.join(STREAM_TOKENS)])
+        self.assertEqual(len(self.server.calls), 1)
+
+    def test_truncated_stream_is_not_cached(self):
+        StubHandler.send_done = False
+        self.assertEqual(list(self.client.stream(self.data)), STREAM_TOKENS)
+        self.assertIsNone(self.client.cache.get(canonical_hash(self.data)))
+
+    def test_busy_when_no_slot_and_slot_released_on_close(self):
+        client = self.make_client(max_concurrency=1, acquire_timeout=0.1)
+        try:
+            stream = client.stream(self.data)
+            self.assertEqual(next(stream), STREAM_TOKENS[0])
+            with self.assertRaises(ReportBusyError):
+                client.generate(dict(self.data, diagnosis_time='other'))
+
+            stream.close()
+            self.assertEqual(client.generate(dict(self.data, diagnosis_time='other')), '诊断报告')
+        finally:
+            client.session.close()
+
+    def test_missing_api_key(self):
+        client = ReportClient(endpoint=self.client.endpoint, api_key='')
+        with self.assertRaisesRegex(RuntimeError, '未配置'):
+            client.generate(self.data)
+
+
+class ReportCacheTest(unittest.TestCase):
+    def test_lru_eviction_and_disk_fallback(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ReportCache(max_entries=1, cache_dir=cache_dir)
+            cache.put('a', 'A')
+            cache.put('b', 'B')
+            self.assertNotIn('a', cache._entries)
+            self.assertEqual(cache.get('a'), 'A')
+            self.assertIsNone(ReportCache(max_entries=1).get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
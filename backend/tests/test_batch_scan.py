@@ -0,0 +1,63 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_scan
+
+
+class RunBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp, 'data')
+        os.makedirs(self.data_dir)
+        rng = np.random.default_rng(0)
+        for i in range(3):
+            frame = pd.DataFrame(rng.standard_normal((2048, 2)), columns=['加速度X', '加速度Y'])
+            frame.to_csv(os.path.join(self.data_dir, f'record_{i}.csv'), index=False)
+        self.output = os.path.join(self.tmp, 'summary.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def run_batch(self, **kwargs):
+        return batch_scan.run_batch(self.data_dir, self.output, workers=1, model=False,
+                                    base_freqs={'外圈': 107.4}, **kwargs)
+
+    def test_summary_has_one_row_per_axis(self):
+        self.run_batch()
+        summary = pd.read_csv(self.output)
+        self.assertEqual(len(summary), 6)
+        self.assertTrue(summary['error'].isna().all())
+        self.assertFalse(os.path.exists(self.output + '.partial.csv'))
+
+    def test_journal_write_error_is_not_masked(self):
+        # 写日志失败时应抛出原始异常，而不是 join() 的 'Pool is still running'
+        with mock.patch.object(batch_scan.csv.DictWriter, 'writerows', side_effect=OSError('No space left on device')):
+            with self.assertRaisesRegex(OSError, 'No space left on device'):
+                self.run_batch()
+
+    def test_resume_skips_finished_files(self):
+        with mock.patch.object(batch_scan, 'finalize'):
+            self.run_batch()
+        journal = self.output + '.partial.csv'
+        self.assertTrue(os.path.exists(journal))
+
+        self.assertEqual(len(batch_scan.load_checkpoint(journal)), 3)
+
+        # 续跑时最后一个文件视为可能未写完而重新处理，其余文件跳过，结果不重复
+        self.run_batch()
+        summary = pd.read_csv(self.output)
+        self.assertEqual(len(summary), 6)
+        self.assertFalse(summary.duplicated(['file', 'axis']).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
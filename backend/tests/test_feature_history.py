@@ -0,0 +1,107 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feature_history import SECONDS_PER_DAY, FeatureHistory
+
+T0 = 1.7e9
+METRIC = '加速度X|kurtosis'
+
+
+class FeatureHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.history = FeatureHistory(os.path.join(self.tmp, 'history.db'), half_life_days=7.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def record_all(self, asset_id, days, values):
+        for day, value in zip(days, values):
+            self.history.record(asset_id, {'加速度X': {'kurtosis': float(value)}},
+                                recorded_at=T0 + day * SECONDS_PER_DAY)
+
+    def trend(self, asset_id):
+        return self.history.get_trends(asset_id, METRIC)[0]
+
+    def test_trend_matches_numpy(self):
+        rng = np.random.default_rng(1)
+        days = np.sort(rng.uniform(0, 90, 30))
+        values = 2.5 + 0.01 * days + 0.1 * rng.standard_normal(len(days))
+        self.record_all('A', days, values)
+
+        trend = self.trend('A')
+        slope, intercept = np.polyfit(days - days[0], values, 1)
+        self.assertEqual(trend['count'], len(days))
+        self.assertAlmostEqual(trend['mean'], np.mean(values), places=9)
+        self.assertAlmostEqual(trend['std'], np.std(values, ddof=1), places=9)
+        self.assertAlmostEqual(trend['min'], np.min(values), places=12)
+        self.assertAlmostEqual(trend['max'], np.max(values), places=12)
+        self.assertAlmostEqual(trend['slope_per_day'], slope, places=9)
+        self.assertAlmostEqual(trend['intercept'], intercept, places=9)
+
+    def test_out_of_order_inserts(self):
+        rng = np.random.default_rng(2)
+        days = np.arange(0, 40, 2.0)
+        values = 3.0 + 0.05 * days + 0.1 * rng.standard_normal(len(days))
+        self.record_all('in_order', days, values)
+        shuffled = rng.permutation(len(days))
+        self.record_all('shuffled', days[shuffled], values[shuffled])
+
+        ordered, backfilled = self.trend('in_order'), self.trend('shuffled')
+        # 回填旧记录时最早/最晚时间与最新值仍按时间而非写入顺序确定
+        self.assertEqual(backfilled['first_time'], T0)
+        self.assertEqual(backfilled['last_time'], T0 + days[-1] * SECONDS_PER_DAY)
+        self.assertEqual(backfilled['last_value'], values[-1])
+        # 回归零点不同，斜率与统计量应一致
+        for key in ('count', 'mean', 'std', 'min', 'max', 'slope_per_day', 'recent_slope_per_day'):
+            self.assertAlmostEqual(backfilled[key], ordered[key], places=9, msg=key)
+
+        # 截距换算到同一时刻比较
+        for slope_key, intercept_key in (('slope_per_day', 'intercept'), ('recent_slope_per_day', 'recent_intercept')):
+            at_last = [t[intercept_key] + t[slope_key] * (t['last_time'] - t['regression_origin']) / SECONDS_PER_DAY
+                       for t in (ordered, backfilled)]
+            self.assertAlmostEqual(at_last[0], at_last[1], places=9, msg=intercept_key)
+
+    def test_recent_slope_matches_weighted_polyfit(self):
+        rng = np.random.default_rng(0)
+        days = np.sort(rng.uniform(0, 60, 40))
+        values = 3.0 + 0.02 * days + 0.05 * rng.standard_normal(len(days))
+        self.record_all('A', days, values)
+
+        # 权重按距最后一条记录的时间指数衰减；polyfit 的 w 作用于残差，需开平方
+        weights = 0.5 ** ((days[-1] - days) / 7.0)
+        slope, intercept = np.polyfit(days - days[0], values, 1, w=np.sqrt(weights))
+        trend = self.trend('A')
+        self.assertAlmostEqual(trend['recent_slope_per_day'], slope, places=9)
+        self.assertAlmostEqual(trend['recent_intercept'], intercept, places=9)
+
+    def test_remaining_life_follows_recent_degradation(self):
+        # 180 天平稳后最近 14 天峭度快速上升
+        flat_days = np.arange(0, 180, 2.0)
+        rising_days = np.arange(180, 194, 1.0)
+        days = np.concatenate([flat_days, rising_days])
+        values = np.concatenate([np.full(len(flat_days), 3.0), 3.0 + 0.2 * (rising_days - 179)])
+        self.record_all('A', days, values)
+
+        recent = self.history.remaining_life('A', METRIC, threshold=8.0)
+        overall = self.history.remaining_life('A', METRIC, threshold=8.0, window='all')
+        self.assertEqual(recent['window'], 'recent')
+        self.assertGreater(recent['recent_slope_per_day'], 10 * overall['slope_per_day'])
+        self.assertLess(recent['remaining_days'], 60)
+        self.assertGreater(overall['remaining_days'], 10 * recent['remaining_days'])
+
+    def test_remaining_life_rejects_unknown_window(self):
+        self.record_all('A', [0, 1], [3.0, 3.1])
+        with self.assertRaises(ValueError):
+            self.history.remaining_life('A', METRIC, threshold=8.0, window='last-month')
+
+
+if __name__ == '__main__':
+    unittest.main()
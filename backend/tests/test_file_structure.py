@@ -0,0 +1,98 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_structure import plan_read_kwargs, sniff_csv
+
+ROWS = 50
+
+
+def data_lines(sep=',', with_rate=False):
+    """第 i 行的加速度为 (i, -i)，便于核对读取起点"""
+    lines = []
+    for i in range(ROWS):
+        fields = [f"{i * 0.01:.2f}", f"{-i * 0.01:.2f}"]
+        if with_rate:
+            fields.append('25600' if i == 0 else '')
+        lines.append(sep.join(fields))
+    return lines
+
+
+class SniffCsvTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, lines, encoding='utf-8'):
+        path = os.path.join(self.tmp, 'record.csv')
+        with open(path, 'w', encoding=encoding, newline='') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def read(self, path, info):
+        return pd.read_csv(path, **plan_read_kwargs(info['plan']))
+
+    def assert_reads_all_rows(self, df, column):
+        self.assertEqual(len(df), ROWS)
+        np.testing.assert_allclose(df[column].values, np.arange(ROWS) * 0.01)
+
+    def test_preamble_with_blank_lines(self):
+        path = self.write(['设备编号: A-01', '', '测点: 驱动端', '', '加速度X,加速度Y'] + data_lines())
+        info = sniff_csv(path)
+
+        self.assertEqual(info['header_row'], 4)
+        self.assertEqual(info['plan']['skiprows'], 4)
+        self.assertEqual(info['accel_columns'], ['加速度X', '加速度Y'])
+        self.assert_reads_all_rows(self.read(path, info), '加速度X')
+
+    def test_no_header(self):
+        path = self.write(data_lines())
+        info = sniff_csv(path)
+
+        self.assertIsNone(info['header_row'])
+        self.assertIsNone(info['plan']['header'])
+        self.assertEqual(info['plan']['skiprows'], 0)
+        self.assertEqual(info['accel_columns'], [])
+        self.assert_reads_all_rows(self.read(path, info), 0)
+
+    def test_tab_delimiter(self):
+        path = self.write(['加速度X\t加速度Y'] + data_lines(sep='\t'))
+        info = sniff_csv(path)
+
+        self.assertEqual(info['plan']['sep'], '\t')
+        self.assertEqual(info['accel_columns'], ['加速度X', '加速度Y'])
+        self.assert_reads_all_rows(self.read(path, info), '加速度X')
+
+    def test_sampling_rate_only_in_first_row(self):
+        path = self.write(['加速度X,加速度Y,采样频率'] + data_lines(with_rate=True))
+        info = sniff_csv(path)
+
+        self.assertEqual(info['header_row'], 0)
+        self.assertEqual(info['sampling_rate_column'], '采样频率')
+        self.assertEqual(info['sampling_rate'], 25600.0)
+        self.assert_reads_all_rows(self.read(path, info), '加速度X')
+
+    def test_gbk_header(self):
+        path = self.write(['时间,加速度X,加速度Y'] + [f"{i}," + line for i, line in enumerate(data_lines())],
+                          encoding='gbk')
+        info = sniff_csv(path)
+
+        self.assertEqual(info['plan']['encoding'], 'gbk')
+        self.assertEqual(info['columns'], ['时间', '加速度X', '加速度Y'])
+        self.assertEqual(info['accel_columns'], ['加速度X', '加速度Y'])
+        df = self.read(path, info)
+        self.assertEqual(list(df.columns), ['加速度X', '加速度Y'])
+        self.assert_reads_all_rows(df, '加速度X')
+
+
+if __name__ == '__main__':
+    unittest.main()
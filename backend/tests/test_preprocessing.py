@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import INDICATOR_LABELS, extract_indicators, stack_axes
+
+
+def reference_indicators(x):
+    """逐轴的参考实现：numpy 统计量与 pandas 的 kurtosis()/skew()"""
+    x = np.asarray(x, dtype=float)
+    rms = np.sqrt(np.mean(x ** 2))
+    peak = np.max(np.abs(x))
+    abs_mean = np.mean(np.abs(x))
+    return {
+        "mean": np.mean(x),
+        "std": np.std(x),
+        "rms": rms,
+        "peak": peak,
+        "peak_to_peak": np.ptp(x),
+        "crest_factor": peak / rms,
+        "impulse_factor": peak / abs_mean,
+        "shape_factor": rms / abs_mean,
+        "clearance_factor": peak / np.mean(np.sqrt(np.abs(x))) ** 2,
+        "kurtosis": pd.Series(x).kurtosis(),
+        "skewness": pd.Series(x).skew(),
+    }
+
+
+class ExtractIndicatorsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # 三轴不等长，其中一轴带冲击，峭度与偏度明显偏离 0
+        impulsive = rng.standard_normal(3000)
+        impulsive[::97] += 6.0
+        self.signals = [rng.standard_normal(4096), impulsive, rng.exponential(size=2500) - 1.0]
+
+    def assert_matches(self, actual, expected):
+        self.assertEqual(set(actual), set(INDICATOR_LABELS))
+        for key, value in expected.items():
+            self.assertAlmostEqual(float(actual[key]), float(value), places=9, msg=key)
+
+    def test_whole_signal_matches_pandas(self):
+        indicators = extract_indicators(stack_axes(self.signals))
+        for i, signal in enumerate(self.signals):
+            self.assert_matches({k: v[i] for k, v in indicators.items()}, reference_indicators(signal))
+
+    def test_windows_match_pandas(self):
+        window = 512
+        indicators = extract_indicators(stack_axes(self.signals), window=window)
+        n_windows = 4096 // window
+        self.assertEqual(indicators['kurtosis'].shape, (3, n_windows))
+
+        for i, signal in enumerate(self.signals):
+            for w in range(len(signal) // window):
+                segment = signal[w * window:(w + 1) * window]
+                self.assert_matches({k: v[i, w] for k, v in indicators.items()}, reference_indicators(segment))
+
+    def test_partial_window_uses_valid_points(self):
+        indicators = extract_indicators(stack_axes(self.signals), window=512)
+        # 第 3 轴长 2500，第 5 个窗口只含 2048..2499 的有效点
+        expected = reference_indicators(self.signals[2][2048:])
+        self.assert_matches({k: v[2, 4] for k, v in indicators.items()}, expected)
+
+    def test_padding_only_window_is_nan(self):
+        indicators = extract_indicators(stack_axes(self.signals), window=512)
+        # 第 3 轴的最后三个窗口全部是补齐的 NaN
+        for key, values in indicators.items():
+            self.assertTrue(np.all(np.isnan(values[2, 5:])), key)
+            self.assertTrue(np.all(np.isfinite(values[0])), key)
+
+    def test_empty_axis_is_nan(self):
+        indicators = extract_indicators(stack_axes([self.signals[0], []]))
+        for key, values in indicators.items():
+            self.assertTrue(np.isnan(values[1]), key)
+            self.assertTrue(np.isfinite(values[0]), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kurtogram import fast_kurtogram
+from spectrum import compute_spectrum, impulsive_segment, match_feature_marks, robust_segment
+
+SAMPLING_RATE = 12000.0
+RESONANCE = 3500.0
+FAULT_FREQ = 107.4
+
+
+def impulsive_resonance(seed=3, n=16384):
+    """外圈故障仿真：按故障频率重复的衰减冲击激起 3.5 kHz 共振，叠加噪声与转频分量"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / SAMPLING_RATE
+    x = 0.5 * rng.standard_normal(n) + 0.3 * np.sin(2 * np.pi * 29.95 * t)
+    ring = np.arange(120)
+    for start in np.arange(0.01, n / SAMPLING_RATE, 1 / FAULT_FREQ):
+        i = int(start * SAMPLING_RATE)
+        k = ring[:n - i]
+        x[i:i + len(k)] += 2.0 * np.exp(-k / (0.0008 * SAMPLING_RATE)) * np.sin(2 * np.pi * RESONANCE * k / SAMPLING_RATE)
+    return x
+
+
+def line_to_floor(freqs, env_spec, freq):
+    """故障频率处谱线与 10-500 Hz 中位数底噪之比"""
+    i = np.argmin(np.abs(freqs - freq))
+    floor = np.median(env_spec[(freqs > 10) & (freqs < 500)])
+    return env_spec[max(i - 2, 0):i + 3].max() / floor
+
+
+class EnvelopeBandTest(unittest.TestCase):
+    def setUp(self):
+        x = impulsive_resonance()
+        self.sig = robust_segment(x)
+        self.raw = impulsive_segment(x)
+        _, self.band = fast_kurtogram(self.raw, SAMPLING_RATE)
+
+    def test_band_contains_resonance(self):
+        self.assertEqual(len(self.raw), len(self.sig))
+        self.assertLessEqual(self.band['low'], RESONANCE)
+        self.assertGreaterEqual(self.band['high'], RESONANCE)
+        self.assertGreater(self.band['level'], 0)
+
+    def test_envelope_peak_at_fault_frequency(self):
+        freqs, _, env_spec = compute_spectrum(self.sig, SAMPLING_RATE, self.band, self.raw)
+        low = freqs < 500
+        step = freqs[1] - freqs[0]
+        self.assertLess(abs(freqs[low][np.argmax(env_spec[low])] - FAULT_FREQ), 2 * step)
+
+        marks = match_feature_marks(freqs, env_spec, [{"type": "外圈", "freq": FAULT_FREQ}], {"外圈": FAULT_FREQ}, '加速度X')
+        self.assertEqual(len(marks), 1)
+        self.assertLess(abs(marks[0]['freq'] - FAULT_FREQ), 2 * step)
+
+    def test_demodulating_unfiltered_segment_keeps_impulses(self):
+        freqs, _, raw_env = compute_spectrum(self.sig, SAMPLING_RATE, self.band, self.raw)
+        _, _, filtered_env = compute_spectrum(self.sig, SAMPLING_RATE, self.band)
+        self.assertGreater(line_to_floor(freqs, raw_env, FAULT_FREQ),
+                           1.2 * line_to_floor(freqs, filtered_env, FAULT_FREQ))
+
+    def test_full_band_envelope_uses_filtered_signal(self):
+        freqs, spectrum, env_spec = compute_spectrum(self.sig, SAMPLING_RATE)
+        self.assertEqual(len(freqs), len(spectrum))
+        self.assertEqual(len(freqs), len(env_spec))
+
+
+if __name__ == '__main__':
+    unittest.main()